@@ -9,9 +9,12 @@ File that contains methods related to the MITM command line.
 To be consumed either via bin/pyrdp-mitm.py or via twistd plugin.
 """
 import argparse
+import codecs
+import locale
 import logging
 import logging.handlers
 import os
+import secrets
 import sys
 from typing import Tuple
 from pathlib import Path
@@ -38,6 +41,21 @@ def parseTarget(target: str) -> Tuple[str, int]:
     return targetHost, targetPort
 
 
+def decodePowerShellScript(data: bytes) -> str:
+    """
+    Decode the contents of a PowerShell script file. UTF-8 and UTF-16 files are recognized by their BOM,
+    anything else is decoded with the locale encoding. Newlines are normalized like a text-mode read would.
+    """
+    if data.startswith(codecs.BOM_UTF8):
+        script = data.decode("utf-8-sig")
+    elif data.startswith(codecs.BOM_UTF16_LE) or data.startswith(codecs.BOM_UTF16_BE):
+        script = data.decode("utf-16")
+    else:
+        script = data.decode(locale.getpreferredencoding(False))
+
+    return script.replace("\r\n", "\n").replace("\r", "\n")
+
+
 def validateKeyAndCertificate(private_key: str, certificate: str) -> Tuple[str, str]:
     if (private_key is None) != (certificate is None):
         sys.stderr.write("You must provide both the private key and the certificate")
@@ -109,13 +127,37 @@ def generateCertificate(keyPath: str, certificatePath: str) -> bool:
     :return: True if generation was successful
     """
 
-    if os.name != "nt":
-        nullDevicePath = "/dev/null"
-    else:
-        nullDevicePath = "NUL"
+    key = OpenSSL.crypto.PKey()
+    key.generate_key(OpenSSL.crypto.TYPE_RSA, 2048)
+
+    cert = OpenSSL.crypto.X509()
+    cert.set_version(2)
+    cert.set_serial_number(secrets.randbits(64))
+    cert.get_subject().CN = "www.example.com"
+    cert.get_subject().O = "PYRDP"
+    cert.get_subject().C = "US"
+    cert.set_issuer(cert.get_subject())
+    cert.gmtime_adj_notBefore(0)
+    cert.gmtime_adj_notAfter(365 * 24 * 60 * 60)
+    cert.set_pubkey(key)
+    cert.sign(key, "sha256")
 
-    result = os.system("openssl req -newkey rsa:2048 -nodes -keyout %s -x509 -days 365 -out %s -subj \"/CN=www.example.com/O=PYRDP/C=US\" 2>%s" % (keyPath, certificatePath, nullDevicePath))
-    return result == 0
+    try:
+        # Only the owner may read the private key, like openssl does when it writes one.
+        # O_BINARY only exists on Windows, where it prevents newline translation.
+        keyFlags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+        with os.fdopen(os.open(keyPath, keyFlags, 0o600), "wb") as f:
+            # The mode above only applies to new files, so also tighten an existing one before writing.
+            os.chmod(keyPath, 0o600)
+            f.write(OpenSSL.crypto.dump_privatekey(OpenSSL.crypto.FILETYPE_PEM, key))
+
+        with open(certificatePath, "wb") as f:
+            f.write(OpenSSL.crypto.dump_certificate(OpenSSL.crypto.FILETYPE_PEM, cert))
+    except IOError:
+        return False
+
+    return True
 
 
 def showConfiguration(config: MITMConfig):
@@ -126,10 +168,10 @@ def showConfiguration(config: MITMConfig):
 def buildArgParser():
     parser = argparse.ArgumentParser()
     parser.add_argument("target", help="IP:port of the target RDP machine (ex: 192.168.1.10:3390)")
-    parser.add_argument("-l", "--listen", help="Port number to listen on (default: 3389)", default=3389)
+    parser.add_argument("-l", "--listen", help="Port number to listen on (default: 3389)", default=3389, type=int)
     parser.add_argument("-o", "--output", help="Output folder", default="pyrdp_output")
     parser.add_argument("-i", "--destination-ip", help="Destination IP address of the PyRDP player.If not specified, RDP events are not sent over the network.")
-    parser.add_argument("-d", "--destination-port", help="Listening port of the PyRDP player (default: 3000).", default=3000)
+    parser.add_argument("-d", "--destination-port", help="Listening port of the PyRDP player (default: 3000).", default=3000, type=int)
     parser.add_argument("-k", "--private-key", help="Path to private key (for SSL)")
     parser.add_argument("-c", "--certificate", help="Path to certificate (for SSL)")
     parser.add_argument("-u", "--username", help="Username that will replace the client's username", default=None)
@@ -140,8 +182,8 @@ def buildArgParser():
     parser.add_argument("--payload", help="Command to run automatically upon connection", default=None)
     parser.add_argument("--payload-powershell", help="PowerShell command to run automatically upon connection", default=None)
     parser.add_argument("--payload-powershell-file", help="PowerShell script to run automatically upon connection (as -EncodedCommand)", default=None)
-    parser.add_argument("--payload-delay", help="Time to wait after a new connection before sending the payload, in milliseconds", default=None)
-    parser.add_argument("--payload-duration", help="Amount of time for which input / output should be dropped, in milliseconds. This can be used to hide the payload screen.", default=None)
+    parser.add_argument("--payload-delay", help="Time to wait after a new connection before sending the payload, in milliseconds", default=None, type=int)
+    parser.add_argument("--payload-duration", help="Amount of time for which input / output should be dropped, in milliseconds. This can be used to hide the payload screen.", default=None, type=int)
     parser.add_argument("--disable-active-clipboard", help="Disables the active clipboard stealing to request clipboard content upon connection.", action="store_true")
     parser.add_argument("--crawl", help="Enable automatic shared drive scraping", action="store_true")
     parser.add_argument("--crawler-match-file", help="File to be used by the crawler to chose what to download when scraping the client shared drives.", default=None)
@@ -186,10 +228,10 @@ def configure(cmdline=None) -> MITMConfig:
     config.targetHost = targetHost
     config.targetPort = targetPort
     config.privateKeyFileName = key
-    config.listenPort = int(args.listen)
+    config.listenPort = args.listen
     config.certificateFileName = certificate
     config.attackerHost = args.destination_ip
-    config.attackerPort = int(args.destination_port)
+    config.attackerPort = args.destination_port
     config.replacementUsername = args.username
     config.replacementPassword = args.password
     config.outDir = outDir
@@ -221,9 +263,9 @@ def configure(cmdline=None) -> MITMConfig:
             sys.exit(1)
 
         try:
-            with open(args.payload_powershell_file, "r") as f:
-                powershell = f.read()
-        except IOError as e:
+            with open(args.payload_powershell_file, "rb") as f:
+                powershell = decodePowerShellScript(f.read())
+        except (IOError, UnicodeDecodeError) as e:
             logger.error("Error when trying to read powershell file: %(error)s", {"error": e})
             sys.exit(1)
 
@@ -241,11 +283,7 @@ def configure(cmdline=None) -> MITMConfig:
             logger.error("--payload-duration must be provided if a payload is provided.")
             sys.exit(1)
 
-        try:
-            config.payloadDelay = int(args.payload_delay)
-        except ValueError:
-            logger.error("Invalid payload delay. Payload delay must be an integral number of milliseconds.")
-            sys.exit(1)
+        config.payloadDelay = args.payload_delay
 
         if config.payloadDelay < 0:
             logger.error("Payload delay must not be negative.")
@@ -254,11 +292,7 @@ def configure(cmdline=None) -> MITMConfig:
         if config.payloadDelay < 1000:
             logger.warning("You have provided a payload delay of less than 1 second. We recommend you use a slightly longer delay to make sure it runs properly.")
 
-        try:
-            config.payloadDuration = int(args.payload_duration)
-        except ValueError:
-            logger.error("Invalid payload duration. Payload duration must be an integral number of milliseconds.")
-            sys.exit(1)
+        config.payloadDuration = args.payload_duration
 
         if config.payloadDuration < 0:
             logger.error("Payload duration must not be negative.")
@@ -24,11 +24,9 @@ Qt specific code
 QRemoteDesktop is a widget use for render in rdpy
 """
 
-from io import BytesIO
-
 import rle
-from PySide2.QtCore import QEvent, QPoint, Signal
-from PySide2.QtGui import QColor, QImage, QMatrix, QPainter
+from PySide2.QtCore import QPoint, QRect, Signal
+from PySide2.QtGui import QColor, QImage, QMatrix, QPainter, QPaintEvent
 from PySide2.QtWidgets import QWidget
 
 from pyrdp.logging import log
@@ -67,13 +65,9 @@ def RDPBitmapToQtImage(width: int, height: int, bitsPerPixel: int, isCompressed:
             rle.bitmap_decompress(buf, width, height, data, 3)
 
             # This is a ugly patch because there is a bug in the 24bpp decompression in rle.c
-            # where the red and the blue colors are inverted. Fixing this in python causes a performance
-            # issue, but at least it shows the good colors.
-            buf2 = BytesIO(buf)
-            while buf2.tell() < len(buf2.getvalue()):
-                pixel = buf2.read(3)
-                buf[buf2.tell() - 3] = pixel[2]
-                buf[buf2.tell() - 1] = pixel[0]
+            # where the red and the blue colors are inverted. Swapping them with extended slices
+            # keeps the byte shuffling in C instead of looping over every pixel in Python.
+            buf[0::3], buf[2::3] = buf[2::3], buf[0::3]
 
             image = QImage(buf, width, height, QImage.Format_RGB888)
         else:
@@ -101,23 +95,31 @@ def RDPBitmapToQtImage(width: int, height: int, bitsPerPixel: int, isCompressed:
     return image
 
 
-def convert8bppTo16bpp(buf: bytes):
+def build8bppTo16bppTable():
     """
-    WARNING: The actual 8bpp images work by using a color palette, which this method does not use.
-    This method instead tries to transform indices into colors. This results in a weird looking image,
-    but it can still be useful to see whats happening ¯\_(ツ)_/¯
+    Build the 16bpp value of every possible 8bpp pixel, so conversion is a table lookup per pixel.
     """
-    buf2 = bytearray(len(buf) * 2)
-    i = 0
-    for pixel in buf:
+    table = []
+
+    for pixel in range(256):
         r = (pixel & 0b11000000) >> 6
         g = (pixel & 0b00111000) >> 3
         b = (pixel & 0b00000111) >> 0
-        buf2[i] = (b << 3)
-        buf2[i + 1] = (g << 0) | (r << 5)
-        i += 2
+        table.append(bytes([b << 3, (g << 0) | (r << 5)]))
+
+    return table
+
 
-    return buf2
+PIXEL_8BPP_TO_16BPP = build8bppTo16bppTable()
+
+
+def convert8bppTo16bpp(buf: bytes):
+    """
+    WARNING: The actual 8bpp images work by using a color palette, which this method does not use.
+    This method instead tries to transform indices into colors. This results in a weird looking image,
+    but it can still be useful to see whats happening ¯\_(ツ)_/¯
+    """
+    return bytearray(b"".join(map(PIXEL_8BPP_TO_16BPP.__getitem__, buf)))
 
 
 class QRemoteDesktop(QWidget):
@@ -126,6 +128,8 @@ class QRemoteDesktop(QWidget):
     """
     # This signal can be used by other objects to run code on the main thread. The argument is a callable.
     mainThreadHook = Signal(object)
+    # Radius of the circle drawn at the mouse position.
+    CURSOR_RADIUS = 5
 
     def __init__(self, width: int, height: int, parent: QWidget = None):
         """
@@ -140,6 +144,8 @@ class QRemoteDesktop(QWidget):
         self.setMouseTracking(True)
         #buffer image
         self._buffer = QImage(width, height, QImage.Format_RGB32)
+        #painter reused for every image drawn on the buffer
+        self._bufferPainter = QPainter()
         self.mouseX = width // 2
         self.mouseY = height // 2
 
@@ -161,16 +167,26 @@ class QRemoteDesktop(QWidget):
         """
 
         #fill buffer image
-        qp = QPainter(self._buffer)
-        qp.drawImage(x, y, qimage, 0, 0, width, height)
+        self._bufferPainter.begin(self._buffer)
+        self._bufferPainter.drawImage(x, y, qimage, 0, 0, width, height)
+        self._bufferPainter.end()
 
-        #force update
-        self.update()
+        #only repaint the region that changed
+        self.update(x, y, width, height)
 
     def setMousePosition(self, x: int, y: int):
+        #repaint where the cursor was and where it is now
+        self.update(self.cursorRect())
         self.mouseX = x
         self.mouseY = y
-        self.update()
+        self.update(self.cursorRect())
+
+    def cursorRect(self) -> QRect:
+        """
+        Get the area covered by the mouse cursor, including its outline.
+        """
+        radius = self.CURSOR_RADIUS + 1
+        return QRect(self.mouseX - radius, self.mouseY - radius, radius * 2 + 1, radius * 2 + 1)
 
     def resize(self, width: int, height: int):
         """
@@ -181,15 +197,15 @@ class QRemoteDesktop(QWidget):
         self._buffer = QImage(width, height, QImage.Format_RGB32)
         super().resize(width, height)
 
-    def paintEvent(self, e: QEvent):
+    def paintEvent(self, e: QPaintEvent):
         """
         Call when Qt renderer engine estimate that is needed
         :param e: the event
         """
         qp = QPainter(self)
-        qp.drawImage(0, 0, self._buffer)
+        qp.drawImage(e.rect(), self._buffer, e.rect())
         qp.setBrush(QColor.fromRgb(255, 255, 0, 180))
-        qp.drawEllipse(QPoint(self.mouseX, self.mouseY), 5, 5)
+        qp.drawEllipse(QPoint(self.mouseX, self.mouseY), self.CURSOR_RADIUS, self.CURSOR_RADIUS)
 
     def clear(self):
         self._buffer = QImage(self._buffer.width(), self._buffer.height(), QImage.Format_RGB32)